@@ -0,0 +1,157 @@
+"""Caching helpers for LLM responses and tool results."""
+
+import asyncio
+import shelve
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import orjson
+from langchain_core.caches import RETURN_VAL_TYPE, BaseCache
+from langchain_core.load import dumps, loads
+
+
+class ToolResultCache:
+    """Cache tool results keyed on the tool name and its arguments.
+
+    Entries are kept in a bounded in-memory LRU and persisted to a shelve file
+    so they survive across runs. Entries older than the TTL are treated as misses
+    and removed. Shelve I/O runs in a worker thread so it never blocks the event loop.
+    """
+
+    def __init__(self, path: str = "", ttl: float = 24 * 60 * 60, maxsize: int = 256):
+        """Initialize the cache.
+
+        Args:
+            path: Shelve file used for persistence (in-memory only if empty)
+            ttl: Maximum age of an entry in seconds
+            maxsize: Maximum number of entries kept in memory
+        """
+        self.path = path
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        # Serializes access to the shelve file across worker threads
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(tool_name: str, tool_args: dict) -> str:
+        """Build a deterministic cache key for a tool call."""
+        return f"{tool_name}:{orjson.dumps(tool_args, option=orjson.OPT_SORT_KEYS).decode()}"
+
+    async def aget(self, tool_name: str, tool_args: dict) -> str | None:
+        """Look up a cached result.
+
+        Args:
+            tool_name: Name of the tool
+            tool_args: Arguments the tool was called with
+
+        Returns:
+            The cached result, or None on a miss or expired entry
+        """
+        key = self.make_key(tool_name, tool_args)
+        entry = self._memory.get(key)
+        if entry is None and self.path:
+            entry = await asyncio.to_thread(self._read, key)
+        if entry is None:
+            return None
+
+        stored_at, value = entry
+        if time.time() - stored_at > self.ttl:
+            self._memory.pop(key, None)
+            if self.path:
+                await asyncio.to_thread(self._delete, key)
+            return None
+
+        self._remember(key, entry)
+        return value
+
+    async def aset(self, tool_name: str, tool_args: dict, value: str) -> None:
+        """Store a tool result.
+
+        Args:
+            tool_name: Name of the tool
+            tool_args: Arguments the tool was called with
+            value: Result to cache
+        """
+        key = self.make_key(tool_name, tool_args)
+        entry = (time.time(), value)
+        self._remember(key, entry)
+        if self.path:
+            await asyncio.to_thread(self._write, key, entry)
+
+    def _remember(self, key: str, entry: tuple[float, str]) -> None:
+        """Insert an entry into the in-memory LRU, evicting the oldest if full."""
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def _read(self, key: str) -> tuple[float, str] | None:
+        """Read an entry from the shelve file."""
+        with self._lock, shelve.open(self.path) as db:
+            return db.get(key)
+
+    def _write(self, key: str, entry: tuple[float, str]) -> None:
+        """Write an entry to the shelve file."""
+        with self._lock, shelve.open(self.path) as db:
+            db[key] = entry
+
+    def _delete(self, key: str) -> None:
+        """Remove an entry from the shelve file."""
+        with self._lock, shelve.open(self.path) as db:
+            db.pop(key, None)
+
+
+class LLMResponseCache(BaseCache):
+    """SQLite cache for LLM responses whose entries expire after a TTL.
+
+    Works like langchain_community's SQLiteCache, which never expires entries.
+    Expired rows are treated as misses and purged whenever the cache is opened.
+    """
+
+    def __init__(self, database_path: str, ttl: float = 24 * 60 * 60):
+        """Initialize the cache.
+
+        Args:
+            database_path: SQLite file holding the cached responses
+            ttl: Maximum age of an entry in seconds
+        """
+        self.ttl = ttl
+        self._conn = sqlite3.connect(database_path, check_same_thread=False)
+        # Serializes access to the connection across worker threads
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses ("
+                "prompt TEXT NOT NULL, llm TEXT NOT NULL, response TEXT NOT NULL, "
+                "cached_at REAL NOT NULL, PRIMARY KEY (prompt, llm))"
+            )
+            self._conn.execute(
+                "DELETE FROM llm_responses WHERE cached_at < ?", (time.time() - ttl,)
+            )
+
+    def lookup(self, prompt: str, llm_string: str) -> RETURN_VAL_TYPE | None:
+        """Look up the cached generations for a prompt and LLM configuration."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, cached_at FROM llm_responses WHERE prompt = ? AND llm = ?",
+                (prompt, llm_string),
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl:
+            return None
+        return [loads(generation) for generation in orjson.loads(row[0])]
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        """Store the generations for a prompt and LLM configuration."""
+        response = orjson.dumps([dumps(generation) for generation in return_val]).decode()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?)",
+                (prompt, llm_string, response, time.time()),
+            )
+
+    def clear(self, **kwargs) -> None:
+        """Remove all cached responses."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM llm_responses")
@@ -1,6 +1,7 @@
 """Configuration management for the travel agent."""
 
 import os
+from dataclasses import dataclass, field
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -9,47 +10,60 @@ env_path = Path(__file__).parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path)
 
 
+@dataclass(frozen=True, slots=True)
 class Config:
-    """Configuration class for the travel agent."""
+    """Configuration for the travel agent.
+
+    Attributes:
+        anthropic_api_key: Anthropic API key for Claude
+        tavily_api_key: Tavily API key for web search
+        default_model: Model used by the research and recommendation nodes
+        fast_model: Model used by nodes that only summarize/format
+        default_temperature: Sampling temperature for all LLM calls
+        llm_cache_path: SQLite file for cached LLM responses (empty to disable)
+        tool_cache_path: Shelve file for cached search results (empty to disable persistence)
+        cache_ttl_seconds: Maximum age of cached search results, research and node responses
+        semantic_cache_threshold: Minimum similarity score for serving cached research
+    """
 
     # API Keys
-    ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
-    TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
+    anthropic_api_key: str | None = field(default=None, repr=False)
+    tavily_api_key: str | None = field(default=None, repr=False)
 
     # LLM Settings
-    DEFAULT_MODEL = "claude-3-5-sonnet-20241022"
-    DEFAULT_TEMPERATURE = 0.7
-
-    # Validation
-    @classmethod
-    def validate(cls) -> list[str]:
-        """Validate that required environment variables are set.
-
-        Returns:
-            List of missing configuration keys
-        """
-        missing = []
-
-        if not cls.ANTHROPIC_API_KEY:
-            missing.append("ANTHROPIC_API_KEY")
+    default_model: str = "claude-3-5-sonnet-20241022"
+    fast_model: str = "claude-3-5-haiku-20241022"
+    default_temperature: float = 0.7
 
-        if not cls.TAVILY_API_KEY:
-            missing.append("TAVILY_API_KEY")
+    # Caching
+    llm_cache_path: str = ".llm_cache.db"
+    tool_cache_path: str = ".tool_cache"
+    cache_ttl_seconds: int = 24 * 60 * 60
+    semantic_cache_threshold: float = 0.92
 
-        return missing
 
-    @classmethod
-    def is_valid(cls) -> bool:
-        """Check if configuration is valid.
+# Configuration loaded once from the environment
+CONFIG = Config(
+    anthropic_api_key=os.getenv("ANTHROPIC_API_KEY"),
+    tavily_api_key=os.getenv("TAVILY_API_KEY"),
+    llm_cache_path=os.getenv("LLM_CACHE_PATH", ".llm_cache.db"),
+    tool_cache_path=os.getenv("TOOL_CACHE_PATH", ".tool_cache"),
+)
 
-        Returns:
-            True if all required keys are set
-        """
-        return len(cls.validate()) == 0
+# Required environment variables that are not set
+MISSING: tuple[str, ...] = tuple(
+    name
+    for name, value in (
+        ("ANTHROPIC_API_KEY", CONFIG.anthropic_api_key),
+        ("TAVILY_API_KEY", CONFIG.tavily_api_key),
+    )
+    if not value
+)
 
+# True if all required keys are set
+IS_VALID = not MISSING
 
-# Validate configuration on import
-_missing_keys = Config.validate()
-if _missing_keys:
-    print(f"Warning: Missing environment variables: {', '.join(_missing_keys)}")
+# Warn about missing configuration on import
+if MISSING:
+    print(f"Warning: Missing environment variables: {', '.join(MISSING)}")
     print("Please create a .env file with the required keys. See .env.example for reference.")
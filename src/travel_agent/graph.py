@@ -1,6 +1,9 @@
 """LangGraph workflow for the travel agent."""
 
-from langgraph.graph import StateGraph, END
+from functools import lru_cache
+
+from langgraph.graph import StateGraph, START, END
+from langgraph.constants import Send
 from langgraph.checkpoint.base import BaseCheckpointSaver
 from langgraph.store.base import BaseStore
 
@@ -17,12 +20,34 @@ from .nodes import (
 )
 
 
+def dispatch_recommendations(state: TravelAgentState) -> list[Send]:
+    """Fan out to the accommodation and activity nodes in parallel.
+
+    Both branches only depend on the destination research and the itinerary,
+    so they can run concurrently and join again at compile_final_plan.
+
+    Args:
+        state: Current state
+
+    Returns:
+        Send packets for the parallel recommendation branches
+    """
+    return [
+        Send("suggest_accommodations", state),
+        Send("recommend_activities", state),
+    ]
+
+
 def create_travel_agent_graph(
     checkpointer: BaseCheckpointSaver = None,
     store: BaseStore = None,
 ):
     """Create the travel agent workflow graph.
 
+    Calls without a checkpointer or store share one compiled graph. Graphs with
+    persistence are compiled per call, so no reference to the checkpointer or
+    store is kept after the caller drops it.
+
     Args:
         checkpointer: Optional checkpointer for persistence
         store: Optional memory store for user preferences
@@ -30,6 +55,19 @@ def create_travel_agent_graph(
     Returns:
         Compiled LangGraph workflow
     """
+    if checkpointer is None and store is None:
+        return _default_graph()
+    return _compile_graph(checkpointer, store)
+
+
+@lru_cache(maxsize=1)
+def _default_graph():
+    """Compile the graph without persistence once and reuse it."""
+    return _compile_graph(None, None)
+
+
+def _compile_graph(checkpointer: BaseCheckpointSaver | None, store: BaseStore | None):
+    """Build and compile the workflow graph."""
     # Initialize the graph with our state
     workflow = StateGraph(TravelAgentState)
 
@@ -43,13 +81,20 @@ def create_travel_agent_graph(
     workflow.add_node("compile_final_plan", compile_final_plan_node)
     workflow.add_node("save_user_preferences", save_user_preferences_node)
 
-    # Define the workflow edges (sequential flow)
-    workflow.set_entry_point("load_user_preferences")
+    # Define the workflow edges
+    # Research does not depend on saved preferences, so it starts alongside loading them
+    workflow.add_edge(START, "load_user_preferences")
+    workflow.add_edge(START, "research_destination")
     workflow.add_edge("load_user_preferences", "validate_input")
-    workflow.add_edge("validate_input", "research_destination")
-    workflow.add_edge("research_destination", "plan_itinerary")
-    workflow.add_edge("plan_itinerary", "suggest_accommodations")
-    workflow.add_edge("suggest_accommodations", "recommend_activities")
+    workflow.add_edge(["validate_input", "research_destination"], "plan_itinerary")
+
+    # Fan out accommodations and activities in parallel, then join at compile_final_plan
+    workflow.add_conditional_edges(
+        "plan_itinerary",
+        dispatch_recommendations,
+        ["suggest_accommodations", "recommend_activities"],
+    )
+    workflow.add_edge("suggest_accommodations", "compile_final_plan")
     workflow.add_edge("recommend_activities", "compile_final_plan")
     workflow.add_edge("compile_final_plan", "save_user_preferences")
     workflow.add_edge("save_user_preferences", END)
@@ -1,30 +1,672 @@
 """Node functions for the travel agent workflow."""
 
+import asyncio
+import hashlib
 import json
+import re
+import time
+from collections import deque
+from functools import lru_cache
 from langchain_anthropic import ChatAnthropic
-from langchain_core.messages import HumanMessage, SystemMessage
-from langgraph.store.base import BaseStore
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import merge_configs
+from langchain_core.tools import BaseTool
+from langgraph.store.base import BaseStore, GetOp, PutOp
+from langgraph.types import StreamWriter
+
+from .cache import LLMResponseCache, ToolResultCache
+from .config import CONFIG
+from .state import RESET_SEARCH_CACHE, TravelAgentState
+from .tools import SEARCH_TOOL, TOOL_BY_NAME, TRAVEL_TOOLS
+
+# Exact-match cache for LLM responses, keyed on the model settings and prompt
+LLM_CACHE = (
+    LLMResponseCache(CONFIG.llm_cache_path, ttl=CONFIG.cache_ttl_seconds)
+    if CONFIG.llm_cache_path
+    else None
+)
+
+# Cache for web search results, shared across runs
+TOOL_CACHE = ToolResultCache(CONFIG.tool_cache_path, ttl=CONFIG.cache_ttl_seconds)
+
+# Searches currently in flight, keyed like TOOL_CACHE entries
+_PENDING_SEARCHES: dict[str, asyncio.Future] = {}
+
+# Character budget for the snippets of one search result sent back to the LLM
+SEARCH_RESULT_MAX_CHARS = 2000
+
+# Maximum number of tool-calling rounds per node before forcing a final answer
+MAX_TOOL_ITERS = 3
+TOOL_LIMIT_MESSAGE = (
+    "Tool call limit reached. Write your final answer now using the information gathered so far."
+)
+
+# Placeholder stored in state when a tool-calling node ends without any response text
+NO_RESPONSE_TEXT = "No information could be gathered for this section. Please try again."
+
+# Message templates, rendered with str.format_map over TemplateValues
+VALIDATION_TEMPLATE = """
+Travel Details Received:
+- Source: {source}
+- Destination: {destination}
+- Dates: {start_date} to {end_date}
+- Preferences: {preferences}
+- Hobbies/Interests: {hobbies}{saved_prefs_msg}
+
+I'll now create a personalized travel plan for you!
+"""
+
+SAVED_PREFERENCES_TEMPLATE = """
+Previous Travel Preferences Found:
+- Preferred Travel Style: {preferences}
+- Interests/Hobbies: {hobbies}
+- Past Destinations: {past_destinations}
+"""
+
+# Static system prompts, built once. The planning nodes prepend cached trip context
+# to their prompt block, so only the research prompt is a complete SystemMessage.
+RESEARCH_SYSTEM_MESSAGE = SystemMessage(
+    content="""You are a travel research specialist. Research the destination thoroughly and provide:
+1. Overview of the destination
+2. Best attractions and landmarks
+3. Local culture and customs
+4. Transportation options
+5. Weather and best time to visit
+6. Safety considerations
+
+Use the search tool to find current and accurate information."""
+)
+
+ITINERARY_PROMPT_BLOCK = {
+    "type": "text",
+    "text": """You are an expert travel itinerary planner. Create a detailed day-by-day itinerary that:
+1. Balances activities with rest time
+2. Groups nearby attractions logically
+3. Considers travel time between locations
+4. Matches the traveler's interests and preferences
+5. Includes specific timing suggestions
+6. Accounts for meal times and local dining options""",
+}
+
+ACCOMMODATIONS_PROMPT_BLOCK = {
+    "type": "text",
+    "text": """You are a hotel and accommodation specialist. Suggest accommodations that:
+1. Match the traveler's budget and preferences
+2. Are well-located for the planned itinerary
+3. Have good reviews and ratings
+4. Offer relevant amenities
+5. Consider different accommodation types (hotels, hostels, vacation rentals, etc.)
+
+Use the search tool to find current options and prices.""",
+}
+
+ACTIVITIES_PROMPT_BLOCK = {
+    "type": "text",
+    "text": """You are an activity and experience curator. Recommend activities that:
+1. Align with the traveler's hobbies and interests
+2. Are unique to the destination
+3. Fit within the itinerary timeframe
+4. Offer a mix of popular and off-beaten-path experiences
+5. Include booking information and tips
+
+Use the search tool to find current activities, tours, and experiences.""",
+}
+
+COMPILE_PROMPT_BLOCK = {
+    "type": "text",
+    "text": """You are a travel plan compiler. Create a comprehensive, well-organized travel plan that:
+1. Combines all research, itinerary, accommodations, and activities
+2. Presents information in a clear, easy-to-follow format
+3. Includes practical tips and reminders
+4. Adds any final recommendations
+5. Formats the plan beautifully with sections and subsections""",
+}
+
+# Store namespace for cached destination research
+RESEARCH_CACHE_NAMESPACE = ("destination_research",)
 
-from .state import TravelAgentState
-from .tools import TRAVEL_TOOLS
+# Store namespace prefix for cached node responses, keyed per node
+NODE_CACHE_NAMESPACE = "node_responses"
 
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
 
-def create_llm(use_tools: bool = False):
-    """Create an LLM instance.
+
+def create_llm(
+    model: str = CONFIG.default_model,
+    temperature: float = CONFIG.default_temperature,
+    use_tools: bool = False,
+    cache: bool = True,
+):
+    """Get a shared LLM instance.
 
     Args:
+        model: Anthropic model name
+        temperature: Sampling temperature
         use_tools: Whether to bind tools to the LLM
+        cache: Whether responses are read from and written to LLM_CACHE
 
     Returns:
         Configured LLM instance
     """
-    llm = ChatAnthropic(model="claude-3-5-sonnet-20241022", temperature=0.7)
+    return _build_llm(model, temperature, use_tools, cache)
+
+
+@lru_cache(maxsize=None)
+def _build_llm(model: str, temperature: float, use_tools: bool, cache: bool):
+    """Build an LLM once per configuration so clients and tool schemas are reused."""
     if use_tools:
-        llm = llm.bind_tools(TRAVEL_TOOLS)
-    return llm
+        return _build_llm(model, temperature, False, cache).bind_tools(TRAVEL_TOOLS)
+    return ChatAnthropic(model=model, temperature=temperature, cache=LLM_CACHE if cache else False)
+
+
+# Build the clients used by the nodes at import time, off the request path
+create_llm(use_tools=True)
+create_llm(model=CONFIG.fast_model)
+
+
+class StreamWriterCallback(AsyncCallbackHandler):
+    """Forward LLM text tokens to the graph's custom stream."""
+
+    def __init__(self, writer: StreamWriter, node: str):
+        """Initialize the callback.
+
+        Args:
+            writer: LangGraph stream writer injected into the node
+            node: Name of the node emitting the tokens
+        """
+        self.writer = writer
+        self.node = node
+
+    async def on_llm_new_token(self, token, **kwargs) -> None:
+        """Emit a token as a {"node", "token"} event."""
+        text = token if isinstance(token, str) else _text_from_blocks(token)
+        if text:
+            self.writer({"node": self.node, "token": text})
+
+
+async def invoke_llm(
+    llm, messages: list, config: RunnableConfig, writer: StreamWriter, node: str
+):
+    """Call the LLM with token streaming enabled.
+
+    Tokens are forwarded to stream_mode="custom" consumers as they arrive.
+    ainvoke(stream=True) is used rather than astream so that the LLM response
+    cache is still consulted and the parent callbacks (tracing, "messages"
+    streaming) are kept.
+
+    Args:
+        llm: LLM instance from create_llm
+        messages: Messages to send
+        config: Node config, carrying the parent callbacks
+        writer: LangGraph stream writer injected into the node
+        node: Name of the calling node, attached to each streamed token
+
+    Returns:
+        The complete AI message, including any tool calls
+    """
+    config = merge_configs(config, {"callbacks": [StreamWriterCallback(writer, node)]})
+    return await llm.ainvoke(messages, config=config, stream=True)
+
+
+def _text_from_blocks(blocks: list) -> str:
+    """Join the text of a list of content blocks."""
+    return "".join(
+        block if isinstance(block, str) else block.get("text", "")
+        for block in blocks
+        if isinstance(block, str) or block.get("type") == "text"
+    )
+
+
+def response_text(response) -> str:
+    """Extract the text of an LLM response, dropping any tool_use blocks.
+
+    Args:
+        response: AI message returned by the LLM
+
+    Returns:
+        Response text
+    """
+    if isinstance(response.content, str):
+        return response.content
+    return _text_from_blocks(response.content)
+
+
+def new_results(results: dict[str, str], cached_results: dict[str, str]) -> dict[str, str]:
+    """Select tool results that are not yet in the run's search cache.
+
+    Args:
+        results: All tool results seen by a node
+        cached_results: Search cache the node started with
+
+    Returns:
+        Newly gathered results to merge into the search cache
+    """
+    return {key: value for key, value in results.items() if key not in cached_results}
+
+
+class ToolCallError(Exception):
+    """Raised when a tool call fails without the tool itself raising."""
+
+
+async def invoke_tool(tool_call: dict) -> str:
+    """Execute a single tool call, serving search results from the cache when possible.
+
+    Identical searches that are already in flight (e.g. from the parallel
+    recommendation branches) share a single request.
+
+    Args:
+        tool_call: Tool call requested by the LLM
+
+    Returns:
+        Tool result as a string
+
+    Raises:
+        ToolCallError: If the tool is unknown or the search returned an error
+    """
+    tool = TOOL_BY_NAME.get(tool_call["name"])
+    if tool is None:
+        raise ToolCallError(f"Unknown tool: {tool_call['name']}")
+
+    if tool is not SEARCH_TOOL:
+        return str(await tool.ainvoke(tool_call["args"]))
+
+    try:
+        cached = await TOOL_CACHE.aget(tool.name, tool_call["args"])
+    except Exception as e:
+        # If the cache lookup fails, run a live search
+        print(f"Note: Could not read tool cache: {e}")
+        cached = None
+    if cached is not None:
+        return cached
+
+    key = ToolResultCache.make_key(tool.name, tool_call["args"])
+    task = _PENDING_SEARCHES.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_run_search(tool, tool_call["args"]))
+        _PENDING_SEARCHES[key] = task
+        task.add_done_callback(lambda _: _PENDING_SEARCHES.pop(key, None))
+
+    # Shield so one cancelled caller does not cancel the search for the others
+    return await asyncio.shield(task)
+
+
+async def _run_search(tool: BaseTool, tool_args: dict) -> str:
+    """Run a search and store the compacted result in the tool cache.
+
+    The search tool reports failures as error text instead of raising, so
+    anything other than a list of hits is raised as a ToolCallError and never cached.
+    """
+    raw_result = await tool.ainvoke(tool_args)
+    result = compact_search_result(raw_result)
+    if not isinstance(raw_result, list):
+        raise ToolCallError(result)
+
+    try:
+        await TOOL_CACHE.aset(tool.name, tool_args, result)
+    except Exception as e:
+        # If the cache write fails, still return the search result
+        print(f"Note: Could not write tool cache: {e}")
+    return result
+
+
+def compact_search_result(result, max_chars: int = SEARCH_RESULT_MAX_CHARS) -> str:
+    """Shrink a search result before it is sent back to the LLM.
+
+    Keeps only the title, URL and a truncated snippet of each hit, so tool
+    messages stay small no matter how many rounds the tool loop runs.
+
+    Args:
+        result: Raw search tool output (list of hits, JSON string or error text)
+        max_chars: Approximate character budget for all snippets together
+
+    Returns:
+        Compact JSON list of hits, or the truncated text if it is not a list of hits
+    """
+    if isinstance(result, str):
+        try:
+            result = json.loads(result)
+        except ValueError:
+            return result[:max_chars]
+    if not isinstance(result, list):
+        return str(result)[:max_chars]
+
+    hits = [hit for hit in result if isinstance(hit, dict)]
+    snippet_chars = max_chars // max(len(hits), 1)
+    compact = [
+        {
+            **({"title": hit["title"]} if hit.get("title") else {}),
+            "url": hit.get("url", ""),
+            "content": hit.get("content", "")[:snippet_chars],
+        }
+        for hit in hits
+    ]
+    return json.dumps(compact, ensure_ascii=False)
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase text and collapse punctuation/whitespace for cache keys."""
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+def research_cache_query(state: TravelAgentState) -> str:
+    """Build the normalized query used to cache destination research.
+
+    Lowercases and strips punctuation so that e.g. "Paris, France" and
+    "paris france" map to the same entry.
+
+    Args:
+        state: Current state
+
+    Returns:
+        Normalized cache query
+    """
+    fields = (state.get("destination", ""), state.get("hobbies", ""), state.get("preferences", ""))
+    return "|".join(normalize_text(field) for field in fields)
+
+
+def research_cache_scope(state: TravelAgentState) -> str:
+    """Build the trip details that cached research must match exactly.
+
+    The research prompt covers the traveler's origin and dates (e.g. weather
+    during the trip), so research is only reused for the same ones. Unlike the
+    query, the scope is not embedded.
+
+    Args:
+        state: Current state
+
+    Returns:
+        Normalized source and travel dates
+    """
+    fields = (
+        normalize_text(state.get("source", "")),
+        state.get("start_date", ""),
+        state.get("end_date", ""),
+    )
+    return "|".join(fields)
+
+
+def research_cache_key(query: str, scope: str) -> str:
+    """Build the store key for cached research from its query and scope."""
+    return hashlib.sha256(f"{query}|{scope}".encode()).hexdigest()
+
+
+async def lookup_research_cache(store: BaseStore, query: str, scope: str) -> str | None:
+    """Find cached destination research for an exact or semantically similar query.
+
+    Exact matches on the normalized query and scope are served while fresh.
+    Near-duplicate queries with the same scope are served when the store has a
+    semantic index configured on the "query" field and the best match scores at
+    or above CONFIG.semantic_cache_threshold.
+
+    Args:
+        store: LangGraph memory store
+        query: Normalized cache query
+        scope: Trip details from research_cache_scope
+
+    Returns:
+        Cached destination research, or None on a miss
+    """
+    item = await store.aget(RESEARCH_CACHE_NAMESPACE, research_cache_key(query, scope))
+    if item and is_fresh(item.value):
+        return item.value["destination_info"]
+
+    matches = await store.asearch(
+        RESEARCH_CACHE_NAMESPACE, query=query, filter={"scope": scope}, limit=1
+    )
+    if matches and matches[0].score is not None and is_fresh(matches[0].value):
+        if matches[0].score >= CONFIG.semantic_cache_threshold:
+            return matches[0].value["destination_info"]
+
+    return None
+
+
+def is_fresh(value: dict) -> bool:
+    """Check whether a store cache entry is younger than CONFIG.cache_ttl_seconds.
+
+    Args:
+        value: Cached store value with a "cached_at" timestamp
+
+    Returns:
+        True if the entry can still be served
+    """
+    return time.time() - value.get("cached_at", 0) <= CONFIG.cache_ttl_seconds
+
+
+def node_cache_key(node_name: str, state: TravelAgentState) -> str:
+    """Build the response cache key for a node from the trip inputs.
+
+    Args:
+        node_name: Name of the node whose response is cached
+        state: Current state
+
+    Returns:
+        Hex digest identifying the node and normalized trip inputs
+    """
+    fields = (
+        node_name,
+        normalize_text(state.get("source", "")),
+        normalize_text(state.get("destination", "")),
+        state.get("start_date", ""),
+        state.get("end_date", ""),
+        normalize_text(state.get("hobbies", "")),
+        normalize_text(state.get("preferences", "")),
+    )
+    return hashlib.blake2b("|".join(fields).encode(), digest_size=16).hexdigest()
 
 
-def load_user_preferences_node(state: TravelAgentState, *, store: BaseStore) -> TravelAgentState:
+async def get_cached_response(store: BaseStore, node_name: str, key: str) -> str | None:
+    """Read a node's cached response from the store.
+
+    Args:
+        store: LangGraph memory store
+        node_name: Name of the node
+        key: Key from node_cache_key
+
+    Returns:
+        Cached response, or None on a miss, an expired or empty entry, or if no
+        store is available
+    """
+    if not store:
+        return None
+    try:
+        item = await store.aget((NODE_CACHE_NAMESPACE, node_name), key)
+        if item and item.value.get("content") and is_fresh(item.value):
+            return item.value["content"]
+        return None
+    except Exception as e:
+        # If the cache lookup fails, continue with a fresh LLM call
+        print(f"Note: Could not read {node_name} cache: {e}")
+        return None
+
+
+async def put_cached_response(store: BaseStore, node_name: str, key: str, content: str) -> None:
+    """Write a node's response to the store cache.
+
+    Empty responses are not cached.
+
+    Args:
+        store: LangGraph memory store
+        node_name: Name of the node
+        key: Key from node_cache_key
+        content: Response to cache
+    """
+    if not store or not content:
+        return
+    try:
+        await store.aput(
+            (NODE_CACHE_NAMESPACE, node_name),
+            key=key,
+            value={"content": content, "cached_at": time.time()},
+            index=False,
+        )
+    except Exception as e:
+        # If the cache write fails, continue without caching
+        print(f"Note: Could not write {node_name} cache: {e}")
+
+
+def built_on_placeholder(state: TravelAgentState, *sections: str) -> bool:
+    """Check whether any upstream section is the NO_RESPONSE_TEXT placeholder.
+
+    Responses built on a placeholder are still returned but not cached, so a
+    later run with complete upstream sections does not get the degraded result.
+
+    Args:
+        state: Current state
+        sections: State keys the response was (directly or indirectly) built from
+
+    Returns:
+        True if any of the sections is a placeholder
+    """
+    return any(state.get(section) == NO_RESPONSE_TEXT for section in sections)
+
+
+def cached_block(text: str) -> dict:
+    """Wrap text in a system prompt block marked for Anthropic prompt caching.
+
+    Args:
+        text: Block text
+
+    Returns:
+        Content block with an ephemeral cache_control marker
+    """
+    return {"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}
+
+
+def trip_context_block(state: TravelAgentState, section: str) -> dict:
+    """Build the cached prompt prefix describing the trip and one prior result.
+
+    Nodes that build on the same section share an identical prefix, so
+    Anthropic serves it from the prompt cache after the first call.
+
+    Args:
+        state: Current state
+        section: State key of the prior result to include ("destination_info" or "itinerary")
+
+    Returns:
+        Cached system prompt block
+    """
+    title = "DESTINATION RESEARCH" if section == "destination_info" else "DAILY ITINERARY"
+    return cached_block(f"""TRIP DETAILS:
+- Source: {state['source']}
+- Destination: {state['destination']}
+- Dates: {state['start_date']} to {state['end_date']}
+- Traveler interests: {state['hobbies']}
+- Preferences: {state['preferences']}
+
+{title}:
+{state[section]}""")
+
+
+class TemplateValues(dict):
+    """Template values that fall back to a default for missing keys."""
+
+    def __init__(self, values: dict, default: str):
+        """Initialize the values.
+
+        Args:
+            values: Values available to the template
+            default: Text rendered for fields missing from values
+        """
+        super().__init__(values)
+        self.default = default
+
+    def __missing__(self, key: str) -> str:
+        return self.default
+
+
+def render_saved_preferences(preference_data: dict) -> str:
+    """Render stored preferences as the saved_preferences summary.
+
+    Args:
+        preference_data: Preferences entry from the memory store
+
+    Returns:
+        Human-readable summary of the previous preferences
+    """
+    values = TemplateValues({"past_destinations": [], **preference_data}, default="Not specified")
+    return SAVED_PREFERENCES_TEMPLATE.format_map(values)
+
+
+async def run_with_tools(
+    llm,
+    messages: list,
+    cached_results: dict[str, str],
+    config: RunnableConfig,
+    writer: StreamWriter,
+    node: str,
+    final_llm=None,
+) -> tuple[str, dict[str, str]]:
+    """Call a tool-bound LLM, executing requested tool calls until it answers.
+
+    Tool calls within a turn run concurrently, repeated calls reuse earlier
+    successful results (including cached_results), and after
+    MAX_TOOL_ITERS rounds the LLM is asked to answer with what it has. Failed
+    calls are reported to the LLM but not reused or added to search_cache.
+
+    Args:
+        llm: Tool-bound LLM instance from create_llm
+        messages: Initial messages; tool turns are appended in place
+        cached_results: Tool results already gathered during this run (search_cache)
+        config: Node config, used to stream LLM tokens
+        writer: LangGraph stream writer injected into the node
+        node: Name of the calling node
+        final_llm: LLM for the answer after the tool call limit, defaults to llm. It
+            should bypass the LLM cache, since the LLM may still reply with only tool
+            calls and that reply must not be replayed on the next run.
+
+    Returns:
+        Final response text and the new tool results to merge into search_cache.
+        The text is empty if the LLM ended without writing any, e.g. by still
+        requesting tools after the limit; callers must not cache it.
+    """
+    response = await invoke_llm(llm, messages, config, writer, node)
+
+    # Handle tool calls if any, for at most MAX_TOOL_ITERS rounds
+    seen_results: dict[str, str] = dict(cached_results)
+    for iteration in range(MAX_TOOL_ITERS + 1):
+        if not response.tool_calls:
+            break
+
+        keys = [ToolResultCache.make_key(tc["name"], tc["args"]) for tc in response.tool_calls]
+        if iteration == MAX_TOOL_ITERS:
+            # Out of rounds: ask for a final answer instead of running more tools
+            results = dict.fromkeys(keys, TOOL_LIMIT_MESSAGE)
+        else:
+            # Execute new tool calls concurrently, reusing results for repeated ones
+            tasks = {}
+            for key, tool_call in zip(keys, response.tool_calls):
+                if key not in seen_results and key not in tasks:
+                    tasks[key] = asyncio.create_task(invoke_tool(tool_call))
+            tool_results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+            results = seen_results.copy()
+            for key, tool_result in zip(tasks, tool_results):
+                if isinstance(tool_result, Exception):
+                    results[key] = f"Tool error: {tool_result}"
+                else:
+                    results[key] = seen_results[key] = tool_result
+
+        tool_messages = [
+            ToolMessage(content=results[key], tool_call_id=tool_call["id"])
+            for key, tool_call in zip(keys, response.tool_calls)
+        ]
+
+        messages.append(response)
+        messages.extend(tool_messages)
+        # The answer after the limit bypasses the LLM cache (see final_llm)
+        next_llm = (final_llm or llm) if iteration == MAX_TOOL_ITERS else llm
+        response = await invoke_llm(next_llm, messages, config, writer, node)
+
+    content = response_text(response)
+    if not content:
+        print(f"Note: {node} returned no response text")
+    return content, new_results(seen_results, cached_results)
+
+
+async def load_user_preferences_node(
+    state: TravelAgentState, *, store: BaseStore
+) -> TravelAgentState:
     """Load user preferences from memory store.
 
     Args:
@@ -36,45 +678,55 @@ def load_user_preferences_node(state: TravelAgentState, *, store: BaseStore) ->
     """
     user_id = state.get("user_id", "")
     saved_preferences = ""
+    # Stays None unless the store was read
+    past_destinations = None
 
     if user_id and store:
         try:
             # Define namespace for this user's preferences
             namespace = ("user_preferences", user_id)
 
-            # Search for stored preferences
-            memories = store.search(namespace)
-
-            if memories:
-                # Get the most recent preference entry
-                latest_memory = memories[0]
-                preference_data = latest_memory.value
+            # Fetch the preferences and their pre-rendered summary in one round trip
+            item, rendered_item = await store.abatch(
+                [GetOp(namespace, "preferences"), GetOp(namespace, "preferences_rendered")]
+            )
 
-                saved_preferences = f"""
-Previous Travel Preferences Found:
-- Preferred Travel Style: {preference_data.get('preferences', 'Not specified')}
-- Interests/Hobbies: {preference_data.get('hobbies', 'Not specified')}
-- Past Destinations: {preference_data.get('past_destinations', [])}
-"""
+            past_destinations = []
+            if item:
+                preference_data = item.value
+                past_destinations = preference_data.get("past_destinations", [])
+
+                if rendered_item:
+                    saved_preferences = rendered_item.value["text"]
+                else:
+                    saved_preferences = render_saved_preferences(preference_data)
         except Exception as e:
             # If memory retrieval fails, continue without saved preferences
             print(f"Note: Could not load user preferences: {e}")
 
     return {
-        **state,
         "saved_preferences": saved_preferences,
+        "past_destinations": past_destinations,
     }
 
 
-def save_user_preferences_node(state: TravelAgentState, *, store: BaseStore) -> TravelAgentState:
+async def save_user_preferences_node(
+    state: TravelAgentState, *, store: BaseStore
+) -> TravelAgentState:
     """Save user preferences to memory store for future sessions.
 
+    The stored past destinations are re-read right before writing rather than
+    reusing the list loaded at the start of the run, so concurrent runs for the
+    same user do not drop each other's destinations. The preferences and their
+    rendered saved_preferences summary are then written in one batch, so loading
+    does not have to rebuild the summary.
+
     Args:
         state: Current state
         store: LangGraph memory store
 
     Returns:
-        Updated state (unchanged)
+        Update clearing the run's search cache
     """
     user_id = state.get("user_id", "")
 
@@ -83,40 +735,45 @@ def save_user_preferences_node(state: TravelAgentState, *, store: BaseStore) ->
             # Define namespace for this user's preferences
             namespace = ("user_preferences", user_id)
 
-            # Try to get existing preferences to update past destinations
-            past_destinations = []
-            existing_memories = store.search(namespace)
-            if existing_memories:
-                past_destinations = existing_memories[0].value.get("past_destinations", [])
+            # Read the current list; another run may have saved since this one loaded it
+            item = await store.aget(namespace, "preferences")
+            stored_destinations = item.value.get("past_destinations", []) if item else []
+
+            # Keep only the last 5 past destinations
+            past_destinations = deque(stored_destinations, maxlen=5)
 
             # Add current destination if not already in the list
             current_destination = state.get("destination", "")
             if current_destination and current_destination not in past_destinations:
                 past_destinations.append(current_destination)
-                # Keep only last 5 destinations
-                past_destinations = past_destinations[-5:]
 
             # Store updated preferences
             preference_data = {
                 "preferences": state.get("preferences", ""),
                 "hobbies": state.get("hobbies", ""),
-                "past_destinations": past_destinations,
+                "past_destinations": list(past_destinations),
             }
 
-            # Save to memory store
-            store.put(
-                namespace,
-                key="preferences",
-                value=preference_data,
+            # Save the preferences and their rendered summary in one round trip
+            await store.abatch(
+                [
+                    PutOp(namespace, "preferences", preference_data),
+                    PutOp(
+                        namespace,
+                        "preferences_rendered",
+                        {"text": render_saved_preferences(preference_data)},
+                    ),
+                ]
             )
         except Exception as e:
             # If memory save fails, continue without saving
             print(f"Note: Could not save user preferences: {e}")
 
-    return state
+    # The run is over, so drop its search results instead of checkpointing them
+    return {"search_cache": {RESET_SEARCH_CACHE: ""}}
 
 
-def validate_input_node(state: TravelAgentState) -> TravelAgentState:
+async def validate_input_node(state: TravelAgentState) -> TravelAgentState:
     """Validate and confirm the travel details with the user.
 
     Args:
@@ -125,45 +782,45 @@ def validate_input_node(state: TravelAgentState) -> TravelAgentState:
     Returns:
         Updated state with validation message
     """
-    saved_prefs = state.get('saved_preferences', '')
-    saved_prefs_msg = f"\n{saved_prefs}" if saved_prefs else ""
-
-    validation_message = f"""
-Travel Details Received:
-- Source: {state.get('source', 'Not provided')}
-- Destination: {state.get('destination', 'Not provided')}
-- Dates: {state.get('start_date', 'Not provided')} to {state.get('end_date', 'Not provided')}
-- Preferences: {state.get('preferences', 'Not provided')}
-- Hobbies/Interests: {state.get('hobbies', 'Not provided')}{saved_prefs_msg}
+    saved_prefs = state.get("saved_preferences", "")
+    values = TemplateValues(state, default="Not provided")
+    values["saved_prefs_msg"] = f"\n{saved_prefs}" if saved_prefs else ""
 
-I'll now create a personalized travel plan for you!
-"""
-    return {
-        **state,
-        "messages": state.get("messages", []) + [HumanMessage(content=validation_message)],
-    }
+    validation_message = VALIDATION_TEMPLATE.format_map(values)
+    return {"messages": [HumanMessage(content=validation_message)]}
 
 
-def research_destination_node(state: TravelAgentState) -> TravelAgentState:
+async def research_destination_node(
+    state: TravelAgentState, config: RunnableConfig, *, store: BaseStore, writer: StreamWriter
+) -> TravelAgentState:
     """Research the destination and gather relevant information.
 
     Args:
         state: Current state
+        config: Node config, used to stream LLM tokens
+        store: LangGraph memory store used to cache research across runs
+        writer: Stream writer for custom token events
 
     Returns:
         Updated state with destination research
     """
-    llm = create_llm(use_tools=True)
+    cache_query = research_cache_query(state)
+    cache_scope = research_cache_scope(state)
 
-    system_prompt = """You are a travel research specialist. Research the destination thoroughly and provide:
-1. Overview of the destination
-2. Best attractions and landmarks
-3. Local culture and customs
-4. Transportation options
-5. Weather and best time to visit
-6. Safety considerations
+    if store:
+        try:
+            cached_research = await lookup_research_cache(store, cache_query, cache_scope)
+            if cached_research:
+                return {
+                    "destination_info": cached_research,
+                    "search_cache": {RESET_SEARCH_CACHE: ""},
+                }
+        except Exception as e:
+            # If the cache lookup fails, continue with fresh research
+            print(f"Note: Could not read research cache: {e}")
 
-Use the search tool to find current and accurate information."""
+    llm = create_llm(use_tools=True)
+    final_llm = create_llm(use_tools=True, cache=False)
 
     user_prompt = f"""Research {state['destination']} for a trip from {state['start_date']} to {state['end_date']}.
 The traveler is coming from {state['source']}.
@@ -173,232 +830,201 @@ Their preferences: {state['preferences']}
 Provide comprehensive destination information."""
 
     messages = [
-        SystemMessage(content=system_prompt),
+        RESEARCH_SYSTEM_MESSAGE,
         HumanMessage(content=user_prompt),
     ]
 
-    response = llm.invoke(messages)
-
-    # Handle tool calls if any
-    while response.tool_calls:
-        tool_messages = []
-        for tool_call in response.tool_calls:
-            tool_name = tool_call["name"]
-            tool_args = tool_call["args"]
-
-            # Find and execute the tool
-            tool = next((t for t in TRAVEL_TOOLS if t.name == tool_name), None)
-            if tool:
-                tool_result = tool.invoke(tool_args)
-                tool_messages.append({
-                    "role": "tool",
-                    "content": str(tool_result),
-                    "tool_call_id": tool_call["id"],
-                })
+    # Research is the first node to search, so it starts this run's search cache afresh
+    content, search_results = await run_with_tools(
+        llm, messages, {}, config, writer, "research_destination", final_llm=final_llm
+    )
 
-        messages.append(response)
-        messages.extend(tool_messages)
-        response = llm.invoke(messages)
+    if store and content:
+        try:
+            await store.aput(
+                RESEARCH_CACHE_NAMESPACE,
+                key=research_cache_key(cache_query, cache_scope),
+                value={
+                    "query": cache_query,
+                    "scope": cache_scope,
+                    "destination_info": content,
+                    "cached_at": time.time(),
+                },
+                # Embed only the short query so lookups compare like with like
+                index=["query"],
+            )
+        except Exception as e:
+            # If the cache write fails, continue without caching
+            print(f"Note: Could not write research cache: {e}")
 
     return {
-        **state,
-        "destination_info": response.content,
+        "destination_info": content or NO_RESPONSE_TEXT,
+        "search_cache": {RESET_SEARCH_CACHE: "", **search_results},
     }
 
 
-def plan_itinerary_node(state: TravelAgentState) -> TravelAgentState:
+async def plan_itinerary_node(
+    state: TravelAgentState, config: RunnableConfig, *, store: BaseStore, writer: StreamWriter
+) -> TravelAgentState:
     """Create a day-by-day itinerary.
 
     Args:
         state: Current state
+        config: Node config, used to stream LLM tokens
+        store: LangGraph memory store used to cache responses across runs
+        writer: Stream writer for custom token events
 
     Returns:
         Updated state with itinerary
     """
-    llm = create_llm(use_tools=False)
+    cache_key = node_cache_key("plan_itinerary", state)
+    cached = await get_cached_response(store, "plan_itinerary", cache_key)
+    if cached:
+        return {"itinerary": cached}
 
-    system_prompt = """You are an expert travel itinerary planner. Create a detailed day-by-day itinerary that:
-1. Balances activities with rest time
-2. Groups nearby attractions logically
-3. Considers travel time between locations
-4. Matches the traveler's interests and preferences
-5. Includes specific timing suggestions
-6. Accounts for meal times and local dining options"""
-
-    user_prompt = f"""Create a day-by-day itinerary for:
-- Destination: {state['destination']}
-- Dates: {state['start_date']} to {state['end_date']}
-- Traveler interests: {state['hobbies']}
-- Preferences: {state['preferences']}
+    llm = create_llm(model=CONFIG.fast_model)
 
-Destination information:
-{state['destination_info']}
+    user_prompt = """Create a day-by-day itinerary for the trip described above, using the destination research.
 
 Provide a detailed daily schedule."""
 
     messages = [
-        SystemMessage(content=system_prompt),
+        SystemMessage(
+            content=[
+                trip_context_block(state, "destination_info"),
+                ITINERARY_PROMPT_BLOCK,
+            ]
+        ),
         HumanMessage(content=user_prompt),
     ]
 
-    response = llm.invoke(messages)
+    response = await invoke_llm(llm, messages, config, writer, "plan_itinerary")
 
-    return {
-        **state,
-        "itinerary": response.content,
-    }
+    if not built_on_placeholder(state, "destination_info"):
+        await put_cached_response(store, "plan_itinerary", cache_key, response.content)
+
+    return {"itinerary": response.content}
 
 
-def suggest_accommodations_node(state: TravelAgentState) -> TravelAgentState:
+async def suggest_accommodations_node(
+    state: TravelAgentState, config: RunnableConfig, *, store: BaseStore, writer: StreamWriter
+) -> TravelAgentState:
     """Suggest accommodations based on preferences.
 
     Args:
         state: Current state
+        config: Node config, used to stream LLM tokens
+        store: LangGraph memory store used to cache responses across runs
+        writer: Stream writer for custom token events
 
     Returns:
         Updated state with accommodation suggestions
     """
-    llm = create_llm(use_tools=True)
+    cache_key = node_cache_key("suggest_accommodations", state)
+    cached = await get_cached_response(store, "suggest_accommodations", cache_key)
+    if cached:
+        return {"accommodations": cached}
 
-    system_prompt = """You are a hotel and accommodation specialist. Suggest accommodations that:
-1. Match the traveler's budget and preferences
-2. Are well-located for the planned itinerary
-3. Have good reviews and ratings
-4. Offer relevant amenities
-5. Consider different accommodation types (hotels, hostels, vacation rentals, etc.)
-
-Use the search tool to find current options and prices."""
-
-    user_prompt = f"""Suggest accommodations in {state['destination']} for:
-- Dates: {state['start_date']} to {state['end_date']}
-- Preferences: {state['preferences']}
-- Itinerary focus areas: See the itinerary below
+    llm = create_llm(use_tools=True)
+    final_llm = create_llm(use_tools=True, cache=False)
 
-Itinerary:
-{state['itinerary']}
+    user_prompt = f"""Suggest accommodations in {state['destination']} for the trip described above.
+Use the itinerary focus areas to pick well-located options.
 
 Provide 3-5 accommodation recommendations with pros and cons."""
 
     messages = [
-        SystemMessage(content=system_prompt),
+        SystemMessage(
+            content=[
+                trip_context_block(state, "itinerary"),
+                ACCOMMODATIONS_PROMPT_BLOCK,
+            ]
+        ),
         HumanMessage(content=user_prompt),
     ]
 
-    response = llm.invoke(messages)
-
-    # Handle tool calls if any
-    while response.tool_calls:
-        tool_messages = []
-        for tool_call in response.tool_calls:
-            tool_name = tool_call["name"]
-            tool_args = tool_call["args"]
-
-            tool = next((t for t in TRAVEL_TOOLS if t.name == tool_name), None)
-            if tool:
-                tool_result = tool.invoke(tool_args)
-                tool_messages.append({
-                    "role": "tool",
-                    "content": str(tool_result),
-                    "tool_call_id": tool_call["id"],
-                })
+    cached_results = state.get("search_cache") or {}
+    content, search_results = await run_with_tools(
+        llm, messages, cached_results, config, writer, "suggest_accommodations", final_llm=final_llm
+    )
 
-        messages.append(response)
-        messages.extend(tool_messages)
-        response = llm.invoke(messages)
+    if not built_on_placeholder(state, "destination_info", "itinerary"):
+        await put_cached_response(store, "suggest_accommodations", cache_key, content)
 
-    return {
-        **state,
-        "accommodations": response.content,
-    }
+    return {"accommodations": content or NO_RESPONSE_TEXT, "search_cache": search_results}
 
 
-def recommend_activities_node(state: TravelAgentState) -> TravelAgentState:
+async def recommend_activities_node(
+    state: TravelAgentState, config: RunnableConfig, *, store: BaseStore, writer: StreamWriter
+) -> TravelAgentState:
     """Recommend activities based on hobbies and interests.
 
     Args:
         state: Current state
+        config: Node config, used to stream LLM tokens
+        store: LangGraph memory store used to cache responses across runs
+        writer: Stream writer for custom token events
 
     Returns:
         Updated state with activity recommendations
     """
-    llm = create_llm(use_tools=True)
-
-    system_prompt = """You are an activity and experience curator. Recommend activities that:
-1. Align with the traveler's hobbies and interests
-2. Are unique to the destination
-3. Fit within the itinerary timeframe
-4. Offer a mix of popular and off-beaten-path experiences
-5. Include booking information and tips
+    cache_key = node_cache_key("recommend_activities", state)
+    cached = await get_cached_response(store, "recommend_activities", cache_key)
+    if cached:
+        return {"activities": cached}
 
-Use the search tool to find current activities, tours, and experiences."""
+    llm = create_llm(use_tools=True)
+    final_llm = create_llm(use_tools=True, cache=False)
 
     user_prompt = f"""Recommend activities in {state['destination']} for someone interested in: {state['hobbies']}
-- Travel dates: {state['start_date']} to {state['end_date']}
-- Preferences: {state['preferences']}
-
-Existing itinerary:
-{state['itinerary']}
+They should complement the existing itinerary described above.
 
 Suggest specific activities, tours, or experiences they shouldn't miss."""
 
     messages = [
-        SystemMessage(content=system_prompt),
+        SystemMessage(
+            content=[
+                trip_context_block(state, "itinerary"),
+                ACTIVITIES_PROMPT_BLOCK,
+            ]
+        ),
         HumanMessage(content=user_prompt),
     ]
 
-    response = llm.invoke(messages)
+    cached_results = state.get("search_cache") or {}
+    content, search_results = await run_with_tools(
+        llm, messages, cached_results, config, writer, "recommend_activities", final_llm=final_llm
+    )
 
-    # Handle tool calls if any
-    while response.tool_calls:
-        tool_messages = []
-        for tool_call in response.tool_calls:
-            tool_name = tool_call["name"]
-            tool_args = tool_call["args"]
-
-            tool = next((t for t in TRAVEL_TOOLS if t.name == tool_name), None)
-            if tool:
-                tool_result = tool.invoke(tool_args)
-                tool_messages.append({
-                    "role": "tool",
-                    "content": str(tool_result),
-                    "tool_call_id": tool_call["id"],
-                })
-
-        messages.append(response)
-        messages.extend(tool_messages)
-        response = llm.invoke(messages)
+    if not built_on_placeholder(state, "destination_info", "itinerary"):
+        await put_cached_response(store, "recommend_activities", cache_key, content)
 
-    return {
-        **state,
-        "activities": response.content,
-    }
+    return {"activities": content or NO_RESPONSE_TEXT, "search_cache": search_results}
 
 
-def compile_final_plan_node(state: TravelAgentState) -> TravelAgentState:
+async def compile_final_plan_node(
+    state: TravelAgentState, config: RunnableConfig, *, store: BaseStore, writer: StreamWriter
+) -> TravelAgentState:
     """Compile all information into a comprehensive travel plan.
 
     Args:
         state: Current state
+        config: Node config, used to stream LLM tokens
+        store: LangGraph memory store used to cache responses across runs
+        writer: Stream writer for custom token events
 
     Returns:
         Updated state with final compiled plan
     """
-    llm = create_llm(use_tools=False)
+    cache_key = node_cache_key("compile_final_plan", state)
+    cached = await get_cached_response(store, "compile_final_plan", cache_key)
+    if cached:
+        return {"final_plan": cached, "messages": [HumanMessage(content=cached)]}
 
-    system_prompt = """You are a travel plan compiler. Create a comprehensive, well-organized travel plan that:
-1. Combines all research, itinerary, accommodations, and activities
-2. Presents information in a clear, easy-to-follow format
-3. Includes practical tips and reminders
-4. Adds any final recommendations
-5. Formats the plan beautifully with sections and subsections"""
-
-    user_prompt = f"""Compile a final comprehensive travel plan using all the information below:
+    llm = create_llm(model=CONFIG.fast_model)
 
-DESTINATION RESEARCH:
-{state['destination_info']}
-
-DAILY ITINERARY:
-{state['itinerary']}
+    user_prompt = f"""Compile a final comprehensive travel plan using the destination research and itinerary above
+together with the information below:
 
 ACCOMMODATIONS:
 {state['accommodations']}
@@ -410,14 +1036,22 @@ Create a polished, complete travel guide for a trip from {state['source']} to {s
 from {state['start_date']} to {state['end_date']}."""
 
     messages = [
-        SystemMessage(content=system_prompt),
+        SystemMessage(
+            content=[
+                trip_context_block(state, "destination_info"),
+                cached_block(f"DAILY ITINERARY:\n{state['itinerary']}"),
+                COMPILE_PROMPT_BLOCK,
+            ]
+        ),
         HumanMessage(content=user_prompt),
     ]
 
-    response = llm.invoke(messages)
+    response = await invoke_llm(llm, messages, config, writer, "compile_final_plan")
+
+    if not built_on_placeholder(state, "destination_info", "accommodations", "activities"):
+        await put_cached_response(store, "compile_final_plan", cache_key, response.content)
 
     return {
-        **state,
         "final_plan": response.content,
-        "messages": state.get("messages", []) + [HumanMessage(content=response.content)],
+        "messages": [HumanMessage(content=response.content)],
     }
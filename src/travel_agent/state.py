@@ -4,6 +4,35 @@ from typing import Annotated, TypedDict
 from langgraph.graph import add_messages
 
 
+def keep_latest(current: str, update: str) -> str:
+    """Reducer for channels written by parallel branches.
+
+    Keeps the newest non-empty value so concurrent writes merge cleanly.
+    """
+    return update or current
+
+
+def merge_dicts(current: dict, update: dict) -> dict:
+    """Reducer that merges dict updates, e.g. from parallel branches."""
+    return {**(current or {}), **(update or {})}
+
+
+# Key that makes a search_cache update replace the cache instead of merging into it
+RESET_SEARCH_CACHE = "__reset__"
+
+
+def merge_search_cache(current: dict, update: dict) -> dict:
+    """Reducer for the per-run search cache.
+
+    Updates are merged like merge_dicts. An update containing RESET_SEARCH_CACHE
+    replaces the cache instead, so results do not carry over to later runs on
+    the same thread.
+    """
+    if update and RESET_SEARCH_CACHE in update:
+        return {key: value for key, value in update.items() if key != RESET_SEARCH_CACHE}
+    return merge_dicts(current, update)
+
+
 class TravelAgentState(TypedDict):
     """State for the travel agent workflow.
 
@@ -17,11 +46,14 @@ class TravelAgentState(TypedDict):
         preferences: User preferences (e.g., budget level, travel style)
         hobbies: User hobbies and interests
         saved_preferences: Previously saved user preferences loaded from memory
+        past_destinations: Past destinations loaded from memory (None if not loaded)
         destination_info: Research about the destination
         itinerary: Suggested daily itinerary
         accommodations: Accommodation recommendations
         activities: Activity recommendations based on hobbies
         final_plan: Complete travel plan
+        search_cache: Tool results gathered during this run, shared across nodes and
+            cleared when the run starts and ends
     """
 
     messages: Annotated[list, add_messages]
@@ -33,8 +65,10 @@ class TravelAgentState(TypedDict):
     preferences: str
     hobbies: str
     saved_preferences: str
+    past_destinations: list[str] | None
     destination_info: str
     itinerary: str
-    accommodations: str
-    activities: str
+    accommodations: Annotated[str, keep_latest]
+    activities: Annotated[str, keep_latest]
     final_plan: str
+    search_cache: Annotated[dict[str, str], merge_search_cache]
@@ -1,7 +1,46 @@
 """Tools for the travel agent to gather information."""
 
+import re
+from datetime import date
 from langchain_community.tools.tavily_search import TavilySearchResults
-from langchain_core.tools import tool
+from langchain_core.tools import BaseTool, tool
+
+# Northern hemisphere season for each month, indexed by month number - 1
+NORTHERN_HEMISPHERE_SEASONS = (
+    "Winter", "Winter",
+    "Spring", "Spring", "Spring",
+    "Summer", "Summer", "Summer",
+    "Fall", "Fall", "Fall",
+    "Winter",
+)
+
+# Trip date in YYYY-MM-DD format; like strptime("%Y-%m-%d"), month and day may be unpadded
+DATE_PATTERN = re.compile(r"([0-9]{4})-([0-9]{1,2})-([0-9]{1,2})")
+
+# Month number for each month name
+MONTH_NUMBERS = {
+    "january": 1, "february": 2, "march": 3, "april": 4,
+    "may": 5, "june": 6, "july": 7, "august": 8,
+    "september": 9, "october": 10, "november": 11, "december": 12,
+}
+
+
+def parse_date(text: str) -> date:
+    """Parse a date in YYYY-MM-DD format.
+
+    Args:
+        text: Date string
+
+    Returns:
+        Parsed date
+
+    Raises:
+        ValueError: If the text is not a valid YYYY-MM-DD date
+    """
+    match = DATE_PATTERN.fullmatch(text)
+    if match is None:
+        raise ValueError(f"Invalid date: {text!r}")
+    return date(*map(int, match.groups()))
 
 
 def get_search_tool() -> TavilySearchResults:
@@ -29,11 +68,9 @@ def calculate_trip_duration(start_date: str, end_date: str) -> str:
     Returns:
         Number of days for the trip
     """
-    from datetime import datetime
-
     try:
-        start = datetime.strptime(start_date, "%Y-%m-%d")
-        end = datetime.strptime(end_date, "%Y-%m-%d")
+        start = parse_date(start_date)
+        end = parse_date(end_date)
         duration = (end - start).days + 1  # Include both start and end day
         return f"{duration} days"
     except ValueError:
@@ -52,28 +89,21 @@ def get_season_info(destination: str, month: str) -> str:
         Basic season information
     """
     # Simple mapping - in production, this would use actual weather APIs
-    northern_hemisphere_seasons = {
-        "12": "Winter", "1": "Winter", "2": "Winter",
-        "3": "Spring", "4": "Spring", "5": "Spring",
-        "6": "Summer", "7": "Summer", "8": "Summer",
-        "9": "Fall", "10": "Fall", "11": "Fall",
-    }
-
-    month_names = {
-        "january": "1", "february": "2", "march": "3", "april": "4",
-        "may": "5", "june": "6", "july": "7", "august": "8",
-        "september": "9", "october": "10", "november": "11", "december": "12",
-    }
-
-    month_num = month_names.get(month.lower(), month)
-    season = northern_hemisphere_seasons.get(month_num, "Unknown")
+    month_num = int(month) if month.isdecimal() else MONTH_NUMBERS.get(month.lower(), 0)
+    season = NORTHERN_HEMISPHERE_SEASONS[month_num - 1] if 1 <= month_num <= 12 else "Unknown"
 
     return f"In {destination}, the season in month {month} is typically {season}. Consider checking current weather forecasts for accurate information."
 
 
+# Shared search tool instance (its results are cached by the nodes)
+SEARCH_TOOL = get_search_tool()
+
 # List of all tools available to the agent
 TRAVEL_TOOLS = [
-    get_search_tool(),
+    SEARCH_TOOL,
     calculate_trip_duration,
     get_season_info,
 ]
+
+# Tool lookup by name for dispatching tool calls
+TOOL_BY_NAME: dict[str, BaseTool] = {t.name: t for t in TRAVEL_TOOLS}
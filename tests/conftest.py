@@ -0,0 +1,9 @@
+"""Shared test setup."""
+
+import os
+
+# Placeholder keys so the tool and LLM clients can be built, and no cache files on disk
+os.environ.setdefault("ANTHROPIC_API_KEY", "test-key")
+os.environ.setdefault("TAVILY_API_KEY", "test-key")
+os.environ["LLM_CACHE_PATH"] = ""
+os.environ["TOOL_CACHE_PATH"] = ""
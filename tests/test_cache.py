@@ -0,0 +1,66 @@
+"""Tests for the tool result cache."""
+
+import asyncio
+import shelve
+import sqlite3
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration
+
+from travel_agent.cache import LLMResponseCache, ToolResultCache
+
+
+def test_make_key_ignores_argument_order():
+    assert ToolResultCache.make_key("search", {"a": 1, "b": 2}) == ToolResultCache.make_key(
+        "search", {"b": 2, "a": 1}
+    )
+
+
+def test_round_trip_through_shelve(tmp_path):
+    path = str(tmp_path / "cache")
+    asyncio.run(ToolResultCache(path).aset("search", {"query": "paris"}, "hits"))
+
+    assert asyncio.run(ToolResultCache(path).aget("search", {"query": "paris"})) == "hits"
+
+
+def test_expired_entry_is_a_miss_and_removed_from_disk(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache")
+    cache = ToolResultCache(path, ttl=60)
+    monkeypatch.setattr("travel_agent.cache.time.time", lambda: 1000.0)
+    asyncio.run(cache.aset("search", {"query": "paris"}, "hits"))
+
+    monkeypatch.setattr("travel_agent.cache.time.time", lambda: 1061.0)
+    assert asyncio.run(cache.aget("search", {"query": "paris"})) is None
+    with shelve.open(path) as db:
+        assert len(db) == 0
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ToolResultCache(maxsize=2)
+
+    async def fill():
+        await cache.aset("search", {"query": "a"}, "A")
+        await cache.aset("search", {"query": "b"}, "B")
+        await cache.aget("search", {"query": "a"})
+        await cache.aset("search", {"query": "c"}, "C")
+        return [await cache.aget("search", {"query": q}) for q in "abc"]
+
+    assert asyncio.run(fill()) == ["A", None, "C"]
+
+
+def test_llm_response_cache_round_trip_and_expiry(tmp_path, monkeypatch):
+    path = str(tmp_path / "llm.db")
+    generations = [ChatGeneration(message=AIMessage(content="Bonjour"))]
+    monkeypatch.setattr("travel_agent.cache.time.time", lambda: 1000.0)
+    LLMResponseCache(path, ttl=60).update("prompt", "llm", generations)
+
+    monkeypatch.setattr("travel_agent.cache.time.time", lambda: 1060.0)
+    cached = LLMResponseCache(path, ttl=60).lookup("prompt", "llm")
+    assert [generation.message.content for generation in cached] == ["Bonjour"]
+
+    monkeypatch.setattr("travel_agent.cache.time.time", lambda: 1061.0)
+    cache = LLMResponseCache(path, ttl=60)
+    assert cache.lookup("prompt", "llm") is None
+    # Expired rows are purged when the cache is opened
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone() == (0,)
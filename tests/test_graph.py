@@ -0,0 +1,133 @@
+"""Tests for the travel agent graph."""
+
+import asyncio
+from collections import defaultdict
+from itertools import cycle
+
+import pytest
+from langchain_core.language_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+
+from travel_agent import nodes
+from travel_agent.graph import create_travel_agent_graph
+from travel_agent.tools import SEARCH_TOOL
+
+TRIP = {
+    "user_id": "traveler",
+    "source": "New York",
+    "destination": "Paris",
+    "start_date": "2024-07-01",
+    "end_date": "2024-07-05",
+    "preferences": "mid-range",
+    "hobbies": "art",
+}
+
+
+class FakeChatModel:
+    """Chat model stand-in that optionally runs one search before answering."""
+
+    def __init__(self, query=None):
+        self.query = query
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        if self.query and not isinstance(messages[-1], ToolMessage):
+            tool_call = {"name": SEARCH_TOOL.name, "args": {"query": self.query}, "id": "call_1"}
+            return AIMessage(content="", tool_calls=[tool_call])
+        return AIMessage(content=f"Answer for {self.query or 'planning'}")
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    """Fake LLMs whose tool-bound calls search once; returns the executed queries."""
+    executed = []
+
+    async def fake_invoke_tool(tool_call):
+        executed.append(tool_call["args"]["query"])
+        return f"hits for {tool_call['args']['query']}"
+
+    monkeypatch.setattr(nodes, "invoke_tool", fake_invoke_tool)
+    monkeypatch.setattr(
+        nodes,
+        "create_llm",
+        lambda use_tools=False, **kwargs: FakeChatModel("weather" if use_tools else None),
+    )
+    return executed
+
+
+def test_search_cache_does_not_carry_over_between_runs_on_a_thread(searches):
+    graph = create_travel_agent_graph(checkpointer=InMemorySaver())
+    config = {"configurable": {"thread_id": "trip"}}
+
+    async def plan(destination):
+        return await graph.ainvoke({**TRIP, "destination": destination}, config)
+
+    first = asyncio.run(plan("Paris"))
+    second = asyncio.run(plan("Rome"))
+
+    # Within a run the three tool nodes share one search; the next run searches again
+    assert searches == ["weather", "weather"]
+    assert first["search_cache"] == second["search_cache"] == {}
+
+
+def supersteps(graph, config):
+    """Plan a trip and return the nodes scheduled in each superstep, in order."""
+
+    async def run():
+        await graph.ainvoke(TRIP, config)
+        return [sorted(state.next) async for state in graph.aget_state_history(config)]
+
+    return list(reversed(asyncio.run(run())))
+
+
+def test_recommendations_fan_out_in_parallel_and_join_at_compile(monkeypatch):
+    monkeypatch.setattr(nodes, "create_llm", lambda **kwargs: FakeChatModel())
+    graph = create_travel_agent_graph(checkpointer=InMemorySaver())
+
+    steps = supersteps(graph, {"configurable": {"thread_id": "trip"}})
+
+    join = steps.index(["compile_final_plan"])
+    assert steps[join - 1] == ["recommend_activities", "suggest_accommodations"]
+    assert steps[join - 2] == ["plan_itinerary"]
+    assert steps.count(["compile_final_plan"]) == 1
+
+
+def test_research_starts_alongside_loading_preferences(monkeypatch):
+    monkeypatch.setattr(nodes, "create_llm", lambda **kwargs: FakeChatModel())
+    graph = create_travel_agent_graph(checkpointer=InMemorySaver())
+
+    steps = supersteps(graph, {"configurable": {"thread_id": "trip"}})
+
+    assert steps[:4] == [
+        ["__start__"],
+        ["load_user_preferences", "research_destination"],
+        ["validate_input"],
+        ["plan_itinerary"],
+    ]
+
+
+def test_llm_tokens_are_streamed_per_node(monkeypatch):
+    reply = AIMessage(content="Enjoy the trip")
+    monkeypatch.setattr(
+        nodes, "create_llm", lambda **kwargs: GenericFakeChatModel(messages=cycle([reply]))
+    )
+    graph = create_travel_agent_graph()
+
+    async def stream_tokens():
+        tokens = defaultdict(list)
+        async for event in graph.astream(TRIP, stream_mode="custom"):
+            tokens[event["node"]].append(event["token"])
+        return tokens
+
+    tokens = asyncio.run(stream_tokens())
+
+    assert set(tokens) == {
+        "research_destination",
+        "plan_itinerary",
+        "suggest_accommodations",
+        "recommend_activities",
+        "compile_final_plan",
+    }
+    for node_tokens in tokens.values():
+        assert len(node_tokens) > 1
+        assert "".join(node_tokens) == "Enjoy the trip"
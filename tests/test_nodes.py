@@ -0,0 +1,331 @@
+"""Tests for the node helpers."""
+
+import asyncio
+import json
+
+import pytest
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langgraph.store.memory import InMemoryStore
+
+from travel_agent import nodes
+from travel_agent.nodes import (
+    MAX_TOOL_ITERS,
+    NODE_CACHE_NAMESPACE,
+    NO_RESPONSE_TEXT,
+    TOOL_LIMIT_MESSAGE,
+    ToolCallError,
+    compact_search_result,
+    get_cached_response,
+    invoke_tool,
+    load_user_preferences_node,
+    plan_itinerary_node,
+    put_cached_response,
+    research_destination_node,
+    run_with_tools,
+    save_user_preferences_node,
+)
+
+TRIP = {
+    "user_id": "traveler",
+    "source": "New York",
+    "destination": "Paris",
+    "start_date": "2024-07-01",
+    "end_date": "2024-07-05",
+    "preferences": "mid-range",
+    "hobbies": "art",
+}
+
+
+def test_compact_search_result_keeps_title_url_and_truncated_content():
+    hits = [
+        {"title": "Louvre", "url": "https://a", "content": "x" * 100, "score": 0.9},
+        {"title": "", "url": "https://b", "content": "y" * 100},
+    ]
+
+    compact = json.loads(compact_search_result(hits, max_chars=100))
+
+    assert compact == [
+        {"title": "Louvre", "url": "https://a", "content": "x" * 50},
+        {"url": "https://b", "content": "y" * 50},
+    ]
+
+
+def test_compact_search_result_parses_json_strings():
+    hits = json.dumps([{"title": "Louvre", "url": "https://a", "content": "art"}])
+
+    assert json.loads(compact_search_result(hits)) == [
+        {"title": "Louvre", "url": "https://a", "content": "art"}
+    ]
+
+
+def test_compact_search_result_truncates_error_text():
+    assert compact_search_result("HTTPError('429 Too Many Requests')", max_chars=9) == "HTTPError"
+
+
+class ScriptedLLM:
+    """LLM stand-in that returns the scripted responses in order."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    async def ainvoke(self, messages, config=None, **kwargs):
+        self.calls.append(list(messages))
+        return self.responses.pop(0)
+
+
+def tool_turn(*queries):
+    """AI message requesting one search per query."""
+    return AIMessage(
+        content="",
+        tool_calls=[
+            {"name": "search", "args": {"query": query}, "id": f"call_{i}"}
+            for i, query in enumerate(queries)
+        ],
+    )
+
+
+def run(llm, cached_results=None):
+    """Run the tool loop with no-op config and writer."""
+    return asyncio.run(
+        run_with_tools(llm, [], cached_results or {}, {}, lambda chunk: None, "test_node")
+    )
+
+
+def test_run_with_tools_dedups_calls_and_returns_new_results(monkeypatch):
+    invoked = []
+
+    async def fake_invoke_tool(tool_call):
+        invoked.append(tool_call["args"]["query"])
+        return f"hits for {tool_call['args']['query']}"
+
+    monkeypatch.setattr(nodes, "invoke_tool", fake_invoke_tool)
+    cached_key = nodes.ToolResultCache.make_key("search", {"query": "cached"})
+    llm = ScriptedLLM([tool_turn("paris", "paris", "cached"), AIMessage(content="Plan")])
+
+    content, search_results = run(llm, {cached_key: "cached hits"})
+
+    assert content == "Plan"
+    assert invoked == ["paris"]
+    assert list(search_results.values()) == ["hits for paris"]
+    tool_messages = [m.content for m in llm.calls[-1] if isinstance(m, ToolMessage)]
+    assert tool_messages == ["hits for paris", "hits for paris", "cached hits"]
+
+
+def test_run_with_tools_keeps_failed_calls_out_of_results(monkeypatch):
+    async def failing_invoke_tool(tool_call):
+        raise ToolCallError("rate limited")
+
+    monkeypatch.setattr(nodes, "invoke_tool", failing_invoke_tool)
+    llm = ScriptedLLM([tool_turn("paris"), AIMessage(content="Plan")])
+
+    content, search_results = run(llm)
+
+    assert content == "Plan"
+    assert search_results == {}
+    assert llm.calls[-1][-1].content == "Tool error: rate limited"
+
+
+def test_run_with_tools_stops_after_max_iterations(monkeypatch):
+    invoked = []
+
+    async def fake_invoke_tool(tool_call):
+        invoked.append(tool_call["args"]["query"])
+        return "hits"
+
+    monkeypatch.setattr(nodes, "invoke_tool", fake_invoke_tool)
+    llm = ScriptedLLM([tool_turn(f"query {i}") for i in range(MAX_TOOL_ITERS + 1)])
+    final_llm = ScriptedLLM([tool_turn("one more")])
+
+    content, _ = asyncio.run(
+        run_with_tools(llm, [], {}, {}, lambda chunk: None, "test_node", final_llm=final_llm)
+    )
+
+    # The LLM never stops requesting tools, so it gets no text back after the limit
+    assert content == ""
+    assert len(invoked) == MAX_TOOL_ITERS
+    assert len(llm.calls) == MAX_TOOL_ITERS + 1
+    # Only the answer after the limit goes to the (uncached) final LLM
+    assert len(final_llm.calls) == 1
+    assert final_llm.calls[0][-1].content == TOOL_LIMIT_MESSAGE
+
+
+def test_node_cache_skips_empty_and_expired_responses(monkeypatch):
+    store = InMemoryStore()
+
+    async def round_trip(content, age):
+        monkeypatch.setattr(nodes.time, "time", lambda: 1000.0)
+        await put_cached_response(store, "plan_itinerary", content or "empty", content)
+        monkeypatch.setattr(nodes.time, "time", lambda: 1000.0 + age)
+        return await get_cached_response(store, "plan_itinerary", content or "empty")
+
+    ttl = nodes.CONFIG.cache_ttl_seconds
+    assert asyncio.run(round_trip("Day 1", age=ttl)) == "Day 1"
+    assert asyncio.run(round_trip("Day 1", age=ttl + 1)) is None
+    assert asyncio.run(round_trip("", age=0)) is None
+
+
+def test_itinerary_built_on_placeholder_research_is_not_cached(monkeypatch):
+    store = InMemoryStore()
+    monkeypatch.setattr(
+        nodes, "create_llm", lambda **kwargs: ScriptedLLM([AIMessage(content="Day 1")])
+    )
+
+    async def plan(destination_info):
+        state = {**TRIP, "destination_info": destination_info}
+        update = await plan_itinerary_node(state, {}, store=store, writer=lambda chunk: None)
+        cached = await store.asearch((NODE_CACHE_NAMESPACE, "plan_itinerary"))
+        return update["itinerary"], len(cached)
+
+    assert asyncio.run(plan(NO_RESPONSE_TEXT)) == ("Day 1", 0)
+    assert asyncio.run(plan("Paris research")) == ("Day 1", 1)
+
+
+def test_research_cache_matches_query_and_trip_dates(monkeypatch):
+    # Every query embeds identically, so any fresh entry with the same scope is a semantic hit
+    store = InMemoryStore(
+        index={"embed": lambda texts: [[1.0, 0.0] for _ in texts], "dims": 2, "fields": ["query"]}
+    )
+    llm = ScriptedLLM([AIMessage(content="July research"), AIMessage(content="December research")])
+    monkeypatch.setattr(nodes, "create_llm", lambda **kwargs: llm)
+
+    def research(**changes):
+        state = {**TRIP, **changes}
+        update = asyncio.run(
+            research_destination_node(state, {}, store=store, writer=lambda chunk: None)
+        )
+        return update["destination_info"]
+
+    assert research() == "July research"
+    assert research() == "July research"
+    assert research(destination="Paris, France") == "July research"
+    assert research(start_date="2024-12-01", end_date="2024-12-05") == "December research"
+    assert len(llm.calls) == 2
+
+    # Expired research is a miss, exact or semantic
+    now = nodes.time.time()
+    monkeypatch.setattr(nodes.time, "time", lambda: now + nodes.CONFIG.cache_ttl_seconds + 1)
+    query, scope = nodes.research_cache_query(TRIP), nodes.research_cache_scope(TRIP)
+    assert asyncio.run(nodes.lookup_research_cache(store, query, scope)) is None
+
+
+def test_saved_preferences_round_trip():
+    store = InMemoryStore()
+
+    async def round_trip():
+        await save_user_preferences_node(TRIP, store=store)
+        return await load_user_preferences_node({"user_id": "traveler"}, store=store)
+
+    loaded = asyncio.run(round_trip())
+
+    assert loaded["past_destinations"] == ["Paris"]
+    assert "Past Destinations: ['Paris']" in loaded["saved_preferences"]
+    assert "Interests/Hobbies: art" in loaded["saved_preferences"]
+
+
+def test_load_without_a_store_read_leaves_past_destinations_unset():
+    loaded = asyncio.run(load_user_preferences_node({"user_id": ""}, store=InMemoryStore()))
+
+    assert loaded["past_destinations"] is None
+
+
+def test_save_keeps_destinations_saved_by_other_runs():
+    store = InMemoryStore()
+
+    async def save_concurrent_runs():
+        await save_user_preferences_node({**TRIP, "destination": "Lisbon"}, store=store)
+        # Two runs that both loaded ["Lisbon"], finishing one after the other
+        loaded = ["Lisbon"]
+        await save_user_preferences_node(
+            {**TRIP, "destination": "Rome", "past_destinations": loaded}, store=store
+        )
+        await save_user_preferences_node(
+            {**TRIP, "destination": "Tokyo", "past_destinations": loaded}, store=store
+        )
+        # A run whose load failed must not wipe the history either
+        await save_user_preferences_node(
+            {**TRIP, "destination": "Oslo", "past_destinations": None}, store=store
+        )
+        item = await store.aget(("user_preferences", "traveler"), "preferences")
+        return item.value["past_destinations"]
+
+    assert asyncio.run(save_concurrent_runs()) == ["Lisbon", "Rome", "Tokyo", "Oslo"]
+
+
+class FakeSearchTool:
+    """Search tool stand-in that returns each scripted result once, after a short delay."""
+
+    name = "search"
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.queries = []
+
+    async def ainvoke(self, tool_args):
+        self.queries.append(tool_args["query"])
+        await asyncio.sleep(0.01)
+        return self.results.pop(0)
+
+
+@pytest.fixture
+def search_tool(monkeypatch):
+    """Install a fake search tool and an empty tool cache."""
+
+    def install(*results):
+        tool = FakeSearchTool(*results)
+        monkeypatch.setattr(nodes, "SEARCH_TOOL", tool)
+        monkeypatch.setattr(nodes, "TOOL_BY_NAME", {tool.name: tool})
+        monkeypatch.setattr(nodes, "TOOL_CACHE", nodes.ToolResultCache())
+        return tool
+
+    return install
+
+
+def test_identical_in_flight_searches_share_one_request(search_tool):
+    tool = search_tool([{"title": "Louvre", "url": "https://a", "content": "art"}])
+    tool_call = {"name": "search", "args": {"query": "paris"}, "id": "call_1"}
+
+    async def search_concurrently_then_again():
+        first, second = await asyncio.gather(invoke_tool(tool_call), invoke_tool(tool_call))
+        return first, second, await invoke_tool(tool_call)
+
+    first, second, later = asyncio.run(search_concurrently_then_again())
+
+    assert tool.queries == ["paris"]
+    assert first == second == later
+    assert nodes._PENDING_SEARCHES == {}
+
+
+def test_failed_search_is_shared_but_not_cached(search_tool):
+    tool = search_tool("HTTPError('429')", [{"url": "https://a", "content": "art"}])
+    tool_call = {"name": "search", "args": {"query": "paris"}, "id": "call_1"}
+
+    async def search_concurrently():
+        return await asyncio.gather(
+            invoke_tool(tool_call), invoke_tool(tool_call), return_exceptions=True
+        )
+
+    results = asyncio.run(search_concurrently())
+    retry = asyncio.run(invoke_tool(tool_call))
+
+    assert all(isinstance(result, ToolCallError) for result in results)
+    assert tool.queries == ["paris", "paris"]
+    assert json.loads(retry) == [{"url": "https://a", "content": "art"}]
+
+
+def test_load_uses_the_stored_summary_and_renders_when_missing():
+    store = InMemoryStore()
+    namespace = ("user_preferences", "traveler")
+
+    async def load():
+        loaded = await load_user_preferences_node({"user_id": "traveler"}, store=store)
+        return loaded["saved_preferences"]
+
+    asyncio.run(store.aput(namespace, "preferences", {"hobbies": "art"}))
+    rendered = asyncio.run(load())
+    asyncio.run(store.aput(namespace, "preferences_rendered", {"text": "Stored summary"}))
+
+    assert "Interests/Hobbies: art" in rendered
+    assert "Preferred Travel Style: Not specified" in rendered
+    assert asyncio.run(load()) == "Stored summary"
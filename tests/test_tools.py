@@ -0,0 +1,55 @@
+"""Tests for the travel tools."""
+
+import pytest
+from pydantic import ValidationError
+
+from travel_agent.tools import calculate_trip_duration, get_season_info
+
+
+@pytest.mark.parametrize(
+    ("month", "season"),
+    [
+        ("March", "Spring"),
+        ("july", "Summer"),
+        ("10", "Fall"),
+        ("12", "Winter"),
+        ("13", "Unknown"),
+        ("0", "Unknown"),
+        ("²", "Unknown"),
+        ("Smarch", "Unknown"),
+    ],
+)
+def test_get_season_info_parses_month(month, season):
+    result = get_season_info.invoke({"destination": "Paris", "month": month})
+
+    assert f"is typically {season}." in result
+
+
+@pytest.mark.parametrize(
+    ("start_date", "end_date", "expected"),
+    [
+        ("2024-01-05", "2024-01-07", "3 days"),
+        ("2024-1-5", "2024-1-7", "3 days"),
+        ("20240105", "20240107", "Invalid date format. Please use YYYY-MM-DD."),
+        ("2024-02-30", "2024-03-01", "Invalid date format. Please use YYYY-MM-DD."),
+        ("2024-01-05T10:00", "2024-01-07", "Invalid date format. Please use YYYY-MM-DD."),
+    ],
+)
+def test_calculate_trip_duration_accepts_only_yyyy_mm_dd(start_date, end_date, expected):
+    result = calculate_trip_duration.invoke({"start_date": start_date, "end_date": end_date})
+
+    assert result == expected
+
+
+@pytest.mark.parametrize(
+    "args",
+    [
+        {"start_date": 20240105, "end_date": "2024-01-07"},
+        {"start_date": None, "end_date": "2024-01-07"},
+        {"end_date": "2024-01-07"},
+    ],
+)
+def test_calculate_trip_duration_rejects_non_string_dates_in_the_schema(args):
+    # Rejected before the tool body runs; the tool loop reports it as a tool error
+    with pytest.raises(ValidationError):
+        calculate_trip_duration.invoke(args)